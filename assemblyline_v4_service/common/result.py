@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Union, Optional, Dict, Any
+from typing import Iterable, List, Union, Optional, Dict, Any
 
 from assemblyline.common import forge
 from assemblyline.common import log as al_log
@@ -55,6 +55,9 @@ def get_heuristic_primitives(heur: Heuristic):
 
 
 class Heuristic:
+    # '__dict__' keeps services able to set their own attributes on these public classes
+    __slots__ = ('definition', 'heur_id', 'attack_ids', 'frequency', 'score_map', 'signatures', '__dict__')
+
     def __init__(self, heur_id: int,
                  attack_id: Optional[str] = None,
                  signature: Optional[str] = None,
@@ -64,12 +67,13 @@ class Heuristic:
                  score_map: Optional[Dict[str, int]] = None):
 
         # Validate heuristic
-        if heur_id not in HEUR_LIST:
+        definition = HEUR_LIST.get(heur_id)
+        if definition is None:
             raise InvalidHeuristicException(f"Invalid heuristic. A heuristic with ID: {heur_id}, must be added to "
                                             f"the service manifest before using it.")
 
         # Set default values
-        self.definition = HEUR_LIST[heur_id]
+        self.definition = definition
         self.heur_id = heur_id
         self.attack_ids = []
         self.frequency = 0
@@ -85,23 +89,23 @@ class Heuristic:
             attack_ids.append(attack_id)
 
         # If no attack_id are set, check heuristic definition for a default attack id
-        if not attack_ids and self.definition.attack_id:
-            attack_ids.extend(self.definition.attack_id)
+        if not attack_ids and definition.attack_id:
+            attack_ids.extend(definition.attack_id)
 
         # Validate that all attack_ids are in the attack_map
+        valid_attack_ids = self.attack_ids
         for a_id in attack_ids:
             if a_id in attack_map or a_id in software_map:
-                self.attack_ids.append(a_id)
+                valid_attack_ids.append(a_id)
             else:
                 log.warning(f"Invalid attack_id '{a_id}' for heuristic '{heur_id}'. Ignoring it.")
 
         # Signature map is either the provided value or an empty map
-        self.signatures = signatures or {}
+        self.signatures = dict(signatures) if signatures else {}
 
         # If a signature is provided, add it to the map and increment its frequency
         if signature:
-            self.signatures.setdefault(signature, 0)
-            self.signatures[signature] += frequency
+            self.signatures[signature] = self.signatures.get(signature, 0) + frequency
 
         # If there are no signatures, add an empty signature with frequency of one (signatures drives the score)
         if not self.signatures:
@@ -109,26 +113,27 @@ class Heuristic:
 
     @property
     def score(self):
-        temp_score = 0
-        if len(self.signatures) > 0:
-            # There are signatures associated to the heuristic, loop through them and compute a score
-            for sig_name, freq in self.signatures.items():
-                # Find which score we should use for this signature (In order of importance)
-                #   1. Heuristic's signature score map
-                #   2. Live service submitted score map
-                #   3. Heuristic's default signature
-                sig_score = self.definition.signature_score_map.get(sig_name,
-                                                                    self.score_map.get(sig_name,
-                                                                                       self.definition.score))
-                temp_score += sig_score * freq
+        definition = self.definition
+        default_score = definition.score
+        if self.signatures:
+            # There are signatures associated to the heuristic, compute a score from all of them
+            # Find which score we should use for each signature (In order of importance)
+            #   1. Heuristic's signature score map
+            #   2. Live service submitted score map
+            #   3. Heuristic's default signature
+            sig_score_map_get = definition.signature_score_map.get
+            live_score_map_get = self.score_map.get
+            temp_score = sum(sig_score_map_get(sig_name, live_score_map_get(sig_name, default_score)) * freq
+                             for sig_name, freq in self.signatures.items())
         else:
             # There are no signatures associated to the heuristic, compute the new score based of that new frequency
             frequency = self.frequency or 1
-            temp_score = self.definition.score * frequency
+            temp_score = default_score * frequency
 
         # Checking score boundaries
-        if self.definition.max_score:
-            temp_score = min(temp_score, self.definition.max_score)
+        max_score = definition.max_score
+        if max_score:
+            temp_score = min(temp_score, max_score)
 
         return temp_score
 
@@ -144,8 +149,7 @@ class Heuristic:
 
     def add_signature_id(self, signature: str, score: int = None, frequency: int = 1):
         # Add the signature to the map and adds it new frequency to the old value
-        self.signatures.setdefault(signature, 0)
-        self.signatures[signature] += frequency
+        self.signatures[signature] = self.signatures.get(signature, 0) + frequency
 
         # If a new score is assigned to the signature save it here
         if score is not None:
@@ -157,6 +161,9 @@ class Heuristic:
 
 
 class ResultSection:
+    __slots__ = ('_finalized', 'parent', '_section', 'subsections', '_body', '_body_parts', '_body_dirty',
+                 'classification', 'body_format', 'depth', 'tags', 'heuristic', 'title_text', '__dict__')
+
     def __init__(
             self,
             title_text: Union[str, List],
@@ -171,7 +178,7 @@ class ResultSection:
         self.parent = parent
         self._section = None
         self.subsections: List[ResultSection] = []
-        self.body: str = body
+        self.body = body
         self.classification: Classification = classification or SERVICE_ATTRIBUTES.default_result_classification
         self.body_format: BODY_FORMAT = body_format
         self.depth: int = 0
@@ -180,7 +187,9 @@ class ResultSection:
 
         if isinstance(title_text, list):
             title_text = ''.join(title_text)
-        self.title_text = safe_str(title_text)
+        # safe_str leaves printable strings untouched, only pay for it when there is something to escape
+        self.title_text = title_text if isinstance(title_text, str) and title_text.isprintable() \
+            else safe_str(title_text)
 
         if heuristic:
             if not isinstance(heuristic, Heuristic):
@@ -194,28 +203,106 @@ class ResultSection:
             elif isinstance(parent, Result):
                 parent.add_section(self)
 
+    @classmethod
+    def from_parts(cls, parts: List[str], **kwargs) -> ResultSection:
+        """
+        Create a result section with a title made of multiple string parts.
+
+        :param parts: Parts of the title, joined without separator
+        :param kwargs: Any other ResultSection parameter
+        :return: The new result section
+        """
+        return cls(''.join(parts), **kwargs)
+
+    @property
+    def body(self) -> Optional[str, Dict]:
+        # Lines are buffered as fragments and only joined when the body is read
+        if self._body_dirty:
+            parts = self._body_parts
+            self._body = parts[0] if len(parts) == 1 else '\n'.join(parts)
+            # Keep only the joined body so it is not held twice and later reads do not join everything again
+            self._body_parts = [self._body]
+            self._body_dirty = False
+        return self._body
+
+    @body.setter
+    def body(self, body: Optional[str, Dict]) -> None:
+        self._body = body
+        self._body_parts = [] if body is None else [body]
+        self._body_dirty = False
+
+    def _has_body(self) -> bool:
+        # Equivalent to bool(self.body) without joining the buffered fragments
+        parts = self._body_parts
+        return len(parts) > 1 or (len(parts) == 1 and bool(parts[0]))
+
+    def _check_body_is_str(self, line: Any = '') -> None:
+        # Lines are only joined when the body is read, fail now like the previous string concatenation did
+        if not isinstance(line, str) or (self._body_parts and not isinstance(self._body_parts[0], str)):
+            raise TypeError(f"Cannot add a line of type {type(line).__name__} to a body of type "
+                            f"{type(self._body_parts[0]).__name__}")
+
     def add_line(self, text: Union[str, List]) -> None:
         # add_line with a list should join without newline seperator.
         # use add_lines if list should be split one element per line.
+        # use extend_lines rather than calling add_line in a loop.
         if isinstance(text, list):
             text = ''.join(text)
-        textstr = safe_str(text)
-        if self.body:
-            textstr = '\n' + textstr
-            self.body = self.body + textstr
+        textstr = text if isinstance(text, str) and text.isprintable() else safe_str(text)
+        if self._has_body():
+            self._check_body_is_str(textstr)
+            self._body_parts.append(textstr)
         else:
-            self.body = textstr
+            self._body_parts = [textstr]
+        self._body_dirty = True
 
     def add_lines(self, line_list: List[str]) -> None:
+        # add_lines appends the lines to the body as is, without escaping them through safe_str.
+        # use extend_lines to add many lines with the same escaping and empty body handling as add_line.
         if not isinstance(line_list, list):
             log.warning(f"add_lines called with invalid type: {type(line_list)}. ignoring")
             return
 
         segment = '\n'.join(line_list)
-        if self.body is None:
-            self.body = segment
+        self._check_body_is_str()
+        self._body_parts.append(segment)
+        self._body_dirty = True
+
+    def extend_lines(self, lines: Iterable[str]) -> None:
+        """
+        Add multiple lines to the body of a result section in one go.
+        This gives the same body as calling add_line for each line, without the per call overhead: lines are
+        escaped with safe_str and list items are joined without separator. Unlike add_line, every line must be
+        a str, bytes or list of str, anything else raises a TypeError.
+
+        Prefer this over add_lines, which neither escapes the lines nor replaces an empty body.
+
+        :param lines: Lines to add to the body, one element per line
+        """
+        new_parts = []
+        for line in lines:
+            if isinstance(line, list):
+                line = ''.join(line)
+            if not (isinstance(line, str) and line.isprintable()):
+                line = safe_str(line)
+                if not isinstance(line, str):
+                    raise TypeError(f"extend_lines only accepts str, bytes or list of str lines, "
+                                    f"not {type(line).__name__}")
+            new_parts.append(line)
+
+        if not new_parts:
+            return
+
+        if self._has_body():
+            self._check_body_is_str()
+            self._body_parts.extend(new_parts)
         else:
-            self.body = self.body + '\n' + segment
+            # Like add_line, empty lines added to an empty body replace it instead of being appended
+            start = 0
+            while start < len(new_parts) - 1 and not new_parts[start]:
+                start += 1
+            self._body_parts = new_parts[start:]
+        self._body_dirty = True
 
     def add_subsection(self, subsection: ResultSection, on_top: bool = False) -> None:
         """
@@ -240,7 +327,35 @@ class ResultSection:
         if value not in self.tags[tag_type]:
             self.tags[tag_type].append(value)
 
-    def finalize(self, depth: int = 0) -> bool:
+    def add_tags(self, tag_type: str, values: Iterable[Union[str, bytes]]) -> None:
+        """
+        Add multiple values of the same tag type, skipping duplicates.
+        This is the same as calling add_tag for each value, but only checks the existing tags once.
+
+        :param tag_type: Type of the tags
+        :param values: Values of the tags
+        """
+        if tag_type not in self.tags:
+            self.tags[tag_type] = []
+        tag_values = self.tags[tag_type]
+
+        # The set only lives for this call since the tags are public and can be changed in place at any time
+        seen = set(tag_values)
+        for value in values:
+            if isinstance(value, bytes):
+                value = value.decode()
+            if value not in seen:
+                seen.add(value)
+                tag_values.append(value)
+
+    def finalize(self, depth: int = 0, result: Optional[Result] = None) -> bool:
+        """
+        Finalize this section and all of its subsections.
+
+        :param depth: Depth of this section in the section tree
+        :param result: (optional) Result collecting the flattened sections and score while the tree is walked
+        :return: False if this section should not be kept
+        """
         if self._finalized:
             raise ResultAggregationException("Double finalize() on result detected.")
 
@@ -253,25 +368,35 @@ class ResultSection:
 
         self._finalized = True
 
+        # Reserve our spot in the flattened list now so sections stay in pre-order, but only fill it once
+        # the subsections are finalized since they can still raise our classification
+        if result is not None:
+            index = result._reserve_section()
+
         keep_me = True
         tmp_subs = []
         self.depth = depth
         for subsection in self.subsections:
-            subsection.finalize(depth=depth+1)
+            subsection.finalize(depth=depth+1, result=result)
             # Unwrap it if we're going to keep it
             if subsection in self.subsections:
                 tmp_subs.append(subsection)
         self.subsections = tmp_subs
 
         # At this point, all subsections are finalized and we're not deleting ourself
-        if self.parent is not None and isinstance(self.parent, ResultSection):
+        parent = self.parent
+        # Most sections share the default classification with their parent, no need to parse it in that case
+        if parent is not None and isinstance(parent, ResultSection) and self.classification != parent.classification:
+            max_classification = Classification.max_classification
             try:
-                self.parent.classification = \
-                    Classification.max_classification(self.classification, self.parent.classification)
+                parent.classification = max_classification(self.classification, parent.classification)
             except InvalidClassification as e:
                 log.error(f"Failed to finalize section due to a classification error: {str(e)}")
                 keep_me = False
 
+        if result is not None:
+            result._set_section(index, self)
+
         return keep_me
 
     def set_body(self, body: str, body_format: BODY_FORMAT = BODY_FORMAT.TEXT) -> None:
@@ -296,33 +421,39 @@ class ResultSection:
 
 
 class Result:
+    __slots__ = ('_flattened_sections', '_heuristic_primitives', '_score', 'sections', '__dict__')
+
     def __init__(self, sections: Optional[List[ResultSection]] = None) -> None:
         self._flattened_sections: List[Dict[str, Any]] = []
+        self._heuristic_primitives: Dict[Heuristic, Dict[str, Any]] = {}
         self._score: int = 0
         self.sections: List[ResultSection] = sections or []
 
-    def _append_section(self, section: ResultSection) -> None:
-        self._flattened_sections.append(dict(
+    def _reserve_section(self) -> int:
+        self._flattened_sections.append(None)
+        return len(self._flattened_sections) - 1
+
+    def _set_section(self, index: int, section: ResultSection) -> None:
+        heuristic = None
+        if section.heuristic is not None:
+            # Heuristics are often shared by many sections and cannot change while the result is being finalized,
+            # so only compute their primitives once per finalize. Each section still gets its own dict.
+            primitives = self._heuristic_primitives.get(section.heuristic)
+            if primitives is None:
+                primitives = get_heuristic_primitives(section.heuristic)
+                self._heuristic_primitives[section.heuristic] = primitives
+            heuristic = dict(primitives)
+            self._score += heuristic['score']
+
+        self._flattened_sections[index] = dict(
             body=section.body,
             classification=section.classification,
             body_format=section.body_format,
             depth=section.depth,
-            heuristic=get_heuristic_primitives(section.heuristic),
-            tags=unflatten(section.tags),
+            heuristic=heuristic,
+            tags=unflatten(section.tags) if section.tags else {},
             title_text=section.title_text,
-        ))
-
-    def _flatten_sections(self, section: ResultSection, root: bool = True) -> None:
-        if len(section.subsections) > 0:
-            if root:
-                self._append_section(section)
-
-            for subsection in section.subsections:
-                self._append_section(subsection)
-                if len(subsection.subsections) > 0:
-                    self._flatten_sections(subsection, root=False)
-        else:
-            self._append_section(section)
+        )
 
     def add_section(self, section: ResultSection, on_top: bool = False) -> None:
         """
@@ -339,24 +470,18 @@ class Result:
     def finalize(self) -> Dict[str, Any]:
         to_delete_sections = []
 
+        # Finalizing the sections also flattens them and computes the score in the same walk
         for section in self.sections:
             section.parent = self
-            if not section.finalize():
+            if not section.finalize(result=self):
                 to_delete_sections.append(section)
 
+        self._heuristic_primitives.clear()
+
         # Delete sections we can't keep
         for section in to_delete_sections:
             self.sections.remove(section)
 
-        # Flatten all the sections into a flat list
-        for section in self.sections:
-            self._flatten_sections(section)
-
-        for section in self._flattened_sections:
-            heuristic = section.get('heuristic')
-            if heuristic:
-                self._score += heuristic['score']
-
         result = dict(
             score=self._score,
             sections=self._flattened_sections,
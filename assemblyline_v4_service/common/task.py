@@ -2,7 +2,9 @@ import json
 import logging
 import os
 import tempfile
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Set, Tuple
+
+import orjson
 
 from assemblyline.common import forge
 from assemblyline.common import log as al_log
@@ -13,15 +15,48 @@ from assemblyline.odm.messages.task import Task as ServiceTask
 from assemblyline_v4_service.common.result import Result
 
 
+# Names of the services for which logging was already initialized by a Task
+_LOGGING_INITIALIZED: Set[str] = set()
+
+
 class MaxExtractedExceeded(Exception):
     pass
 
 
+# Send datetimes and dataclasses to default=str like json.dumps does, and convert non-string keys to strings
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def _dump_json(data: Dict[str, Any]) -> bytes:
+    # Encodes the same data as json.dumps(..., default=str), except that NaN and Infinity become null,
+    # Enum members are encoded as their value and non-ASCII characters are written as raw UTF-8 instead of
+    # \u escapes, so readers must open the file as UTF-8. Anything orjson refuses to encode (i.e. integers
+    # wider than 64 bits) falls back to the json module so the result is not lost.
+    try:
+        return orjson.dumps(data, default=str, option=_ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        return json.dumps(data, default=str).encode()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    # Hand the whole buffer to the kernel at once, looping only if the write comes back short
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
 class Task:
     def __init__(self, task: ServiceTask):
-        # Initialize logging
-        al_log.init_logging(f'{task.service_name.lower()}', log_level=logging.INFO)
-        self.log = logging.getLogger(f'assemblyline.service.{task.service_name.lower()}')
+        # Initialize logging, only once per service since the handlers do not change between tasks
+        service_name = task.service_name.lower()
+        if service_name not in _LOGGING_INITIALIZED:
+            al_log.init_logging(service_name, log_level=logging.INFO)
+            _LOGGING_INITIALIZED.add(service_name)
+        self.log = logging.getLogger(f'assemblyline.service.{service_name}')
 
         tags = {}
         for t in task.tags:
@@ -31,6 +66,7 @@ class Task:
         self._classification: Classification = forge.get_classification()
         self._service_completed: Optional[str] = None
         self._service_started: Optional[str] = None
+        self._sha_cache: Dict[Tuple[str, int, int], str] = {}
         self._working_directory: Optional[str] = None
         self.deep_scan = task.deep_scan
         self.depth = task.depth
@@ -64,6 +100,16 @@ class Task:
         }
         self.type: str = task.fileinfo.type
 
+    def _sha256(self, path: str) -> str:
+        # Only hash a given file once, unless it was modified since the last time it was hashed
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        sha256 = self._sha_cache.get(key)
+        if sha256 is None:
+            sha256 = get_sha256_for_file(path)
+            self._sha_cache[key] = sha256
+        return sha256
+
     def _add_file(self, path: str, name: str, description: str,
                   classification: Optional[Classification] = None) -> Optional[Dict[str, str]]:
         # Reject empty files
@@ -78,7 +124,7 @@ class Task:
 
         file = dict(
             name=name,
-            sha256=get_sha256_for_file(path),
+            sha256=self._sha256(path),
             description=description,
             classification=self._classification.max_classification(self.min_classification, classification),
             path=path,
@@ -138,7 +184,7 @@ class Task:
         if not os.path.exists(file_path):
             raise Exception("File download failed. File not found on local filesystem.")
 
-        received_sha256 = get_sha256_for_file(file_path)
+        received_sha256 = self._sha256(file_path)
         if received_sha256 != self.sha256:
             raise Exception(f"SHA256 mismatch between requested and "
                             f"downloaded file. {self.sha256} != {received_sha256}")
@@ -219,15 +265,13 @@ class Task:
 
         error = self.get_service_error()
         error_path = os.path.join(tempfile.gettempdir(), f'{self.sid}_{self.sha256}_error.json')
-        with open(error_path, 'w') as f:
-            json.dump(error, f, default=str)
+        _write_file(error_path, _dump_json(error))
         self.log.info(f"Saving error to: {error_path}")
 
     def save_result(self) -> None:
         result = self.get_service_result()
         result_path = os.path.join(tempfile.gettempdir(), f'{self.sid}_{self.sha256}_result.json')
-        with open(result_path, 'w') as f:
-            json.dump(result, f, default=str)
+        _write_file(result_path, _dump_json(result))
         self.log.info(f"Saving result to: {result_path}")
 
     def set_service_context(self, context: str) -> None:
@@ -250,9 +294,8 @@ class Task:
 
     @property
     def working_directory(self) -> str:
-        temp_dir = os.path.join(tempfile.gettempdir(), 'working_directory')
-        if not os.path.isdir(temp_dir):
-            os.makedirs(temp_dir)
         if self._working_directory is None:
+            temp_dir = os.path.join(tempfile.gettempdir(), 'working_directory')
+            os.makedirs(temp_dir, exist_ok=True)
             self._working_directory = tempfile.mkdtemp(dir=temp_dir)
         return self._working_directory
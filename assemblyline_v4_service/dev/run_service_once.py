@@ -120,7 +120,7 @@ class RunService:
             raise Exception("A service error occured and no result json was found.")
 
         # Validate the generated result
-        with open(result_json, 'r') as fh:
+        with open(result_json, 'r', encoding='utf-8') as fh:
             try:
                 result = json.load(fh)
                 result.pop('temp_submission_data', None)
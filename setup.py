@@ -39,6 +39,7 @@ setup(
         'assemblyline-core',
         'cart',
         'fuzzywuzzy',
+        'orjson',
         'python-Levenshtein',
     ],
     package_data={
@@ -0,0 +1,275 @@
+import pytest
+import os
+
+SERVICE_CONFIG_NAME = "service_manifest.yml"
+TEMP_SERVICE_CONFIG_PATH = os.path.join("/tmp", SERVICE_CONFIG_NAME)
+
+
+def setup_module():
+    if not os.path.exists(TEMP_SERVICE_CONFIG_PATH):
+        open_manifest = open(TEMP_SERVICE_CONFIG_PATH, "w")
+        open_manifest.write("name: Sample\nversion: sample\ndocker_config: \n  image: sample")
+
+
+def teardown_module():
+    if os.path.exists(TEMP_SERVICE_CONFIG_PATH):
+        os.remove(TEMP_SERVICE_CONFIG_PATH)
+
+
+@pytest.fixture
+def heuristics(monkeypatch):
+    from assemblyline.odm.models.heuristic import Heuristic as HeuristicDefinition
+    from assemblyline_v4_service.common import result
+    for heur_id, score in [(1, 10), (2, 100)]:
+        monkeypatch.setitem(result.HEUR_LIST, heur_id, HeuristicDefinition(dict(
+            heur_id=heur_id, name=f"Heuristic {heur_id}", score=score, filetype="*", description="blah")))
+
+
+class TestResultSection:
+    @staticmethod
+    def test_add_tag():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_tag("network.static.uri", "http://blah.com")
+        section.add_tag("network.static.uri", b"http://blah.com")
+        section.add_tag("network.static.uri", "http://blah.ca")
+        assert section.tags == {"network.static.uri": ["http://blah.com", "http://blah.ca"]}
+
+    @staticmethod
+    def test_add_tag_shared_tags():
+        from assemblyline_v4_service.common.result import ResultSection
+        tags = {"k": ["a"]}
+        section_a = ResultSection("a", tags=tags)
+        section_b = ResultSection("b", tags=tags)
+        section_a.add_tag("k", "v")
+        section_b.add_tag("k", "v")
+        assert tags == {"k": ["a", "v"]}
+
+    @staticmethod
+    def test_add_tag_replaced_list():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_tag("a", "y")
+        section.tags["a"] = ["x"]
+        section.add_tag("a", "x")
+        assert section.tags == {"a": ["x"]}
+
+    @staticmethod
+    def test_add_tag_removed_value():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_tag("a", "x")
+        section.tags["a"].remove("x")
+        section.add_tag("a", "x")
+        assert section.tags == {"a": ["x"]}
+
+    @staticmethod
+    def test_add_tag_assigned_item():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_tag("a.b", "x")
+        section.tags["a.b"][0] = "y"
+        section.add_tag("a.b", "x")
+        section.add_tag("a.b", "y")
+        assert section.tags == {"a.b": ["y", "x"]}
+
+    @staticmethod
+    def test_add_tag_removed_then_appended():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_tag("a.b", "z")
+        section.add_tag("a.b", "x")
+        section.tags["a.b"].remove("x")
+        section.tags["a.b"].append("q")
+        section.add_tag("a.b", "x")
+        section.add_tag("a.b", "q")
+        assert section.tags == {"a.b": ["z", "q", "x"]}
+
+    @staticmethod
+    def test_add_tag_slice_assignment():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_tag("a.b", "x")
+        section.tags["a.b"][:] = ["w"]
+        section.add_tag("a.b", "x")
+        assert section.tags == {"a.b": ["w", "x"]}
+
+    @staticmethod
+    def test_add_tags():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_tag("a.b", "x")
+        section.tags["a.b"][0] = "y"
+        section.add_tags("a.b", ["x", b"y", "z", "x"])
+        section.add_tags("c.d", iter(["v", "v"]))
+        assert section.tags == {"a.b": ["y", "x", "z"], "c.d": ["v"]}
+
+    @staticmethod
+    @pytest.mark.parametrize("body, lines, expected", [
+        (None, ["a"], "a"),
+        ("", ["a"], "a"),
+        ("b", ["a"], "b\na"),
+        (None, ["", "a"], "a"),
+        ("b", ["", "a"], "b\n\na"),
+        (None, [["a", "b"], "c"], "ab\nc"),
+        (None, [b"a", "c\x01"], "a\nc\\x01"),
+    ])
+    def test_add_line(body, lines, expected):
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah", body=body)
+        for line in lines:
+            section.add_line(line)
+        assert section.body == expected
+
+    @staticmethod
+    @pytest.mark.parametrize("body, line_lists, expected", [
+        (None, [["a", "b"]], "a\nb"),
+        ("", [["a", "b"]], "\na\nb"),
+        ("c", [["a", "b"]], "c\na\nb"),
+        (None, [[]], ""),
+        ("c", [[]], "c\n"),
+        (None, [["a"], ["b", "c"]], "a\nb\nc"),
+    ])
+    def test_add_lines(body, line_lists, expected):
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah", body=body)
+        for line_list in line_lists:
+            section.add_lines(line_list)
+        assert section.body == expected
+
+    @staticmethod
+    def test_body_read_between_adds():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah")
+        section.add_line("a")
+        assert section.body == "a"
+        section.add_lines(["b", "c"])
+        assert section.body == "a\nb\nc"
+        section.add_line("d")
+        assert section.body == "a\nb\nc\nd"
+        section.set_body("e")
+        assert section.body == "e"
+
+    @staticmethod
+    def test_add_line_invalid_type():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah", body={"a": 1})
+        with pytest.raises(TypeError):
+            section.add_line("b")
+        with pytest.raises(TypeError):
+            section.add_lines(["b"])
+        section = ResultSection("blah", body="a")
+        with pytest.raises(TypeError):
+            section.add_lines(["b", 5])
+        assert section.body == "a"
+
+    @staticmethod
+    @pytest.mark.parametrize("body", [None, "", "b"])
+    @pytest.mark.parametrize("lines", [
+        [],
+        ["a"],
+        ["", "a"],
+        ["", ""],
+        ["a", "", "b"],
+        [["a", "b"], "c"],
+        [b"a", "c\x01", "\xe9"],
+    ])
+    def test_extend_lines(body, lines):
+        from assemblyline_v4_service.common.result import ResultSection
+        expected = ResultSection("blah", body=body)
+        for line in lines:
+            expected.add_line(line)
+        section = ResultSection("blah", body=body)
+        section.extend_lines(iter(lines))
+        assert section.body == expected.body
+
+    @staticmethod
+    def test_extend_lines_invalid_type():
+        from assemblyline_v4_service.common.result import ResultSection
+        section = ResultSection("blah", body="a")
+        with pytest.raises(TypeError):
+            section.extend_lines(["b", 5])
+        assert section.body == "a"
+        section = ResultSection("blah", body={"a": 1})
+        with pytest.raises(TypeError):
+            section.extend_lines(["b"])
+
+    @staticmethod
+    def test_from_parts():
+        from assemblyline_v4_service.common.result import Result, ResultSection
+        res = Result()
+        section = ResultSection.from_parts(["Found ", "3", " files"], body="blah", parent=res)
+        assert section.title_text == "Found 3 files"
+        assert section.body == "blah"
+        assert res.sections == [section]
+
+        subsection = ResultSection.from_parts(["a", "\x01b"], parent=section)
+        assert subsection.title_text == "a\\x01b"
+        assert section.subsections == [subsection]
+        assert subsection.parent is section
+
+    @staticmethod
+    def test_custom_attributes(heuristics):
+        from assemblyline_v4_service.common.result import Heuristic, Result, ResultSection
+        for obj in [Heuristic(1), Result(), ResultSection("blah")]:
+            obj.custom = "blah"
+            assert obj.custom == "blah"
+
+
+class TestResult:
+    @staticmethod
+    def test_finalize_shared_heuristic(heuristics):
+        from assemblyline_v4_service.common.result import Heuristic, Result, ResultSection
+        heuristic = Heuristic(1)
+        res = Result()
+        ResultSection("a", heuristic=heuristic, parent=res)
+        ResultSection("b", heuristic=heuristic, parent=res)
+
+        # Public attributes can be changed without going through the Heuristic methods
+        heuristic.score_map["x"] = 5
+        heuristic.signatures["x"] = 1
+
+        sections = res.finalize()["sections"]
+        assert [section["heuristic"]["score"] for section in sections] == [5, 5]
+        assert sections[0]["heuristic"] is not sections[1]["heuristic"]
+
+    @staticmethod
+    def test_finalize(heuristics, monkeypatch):
+        from assemblyline_v4_service.common import result
+        from assemblyline_v4_service.common.result import Result, ResultSection
+
+        # The default classification engine is disabled, use an ordered one so propagation can be checked
+        class DummyClassification:
+            @staticmethod
+            def max_classification(c1, c2):
+                return max(c1, c2)
+
+        monkeypatch.setattr(result, "Classification", DummyClassification)
+
+        res = Result()
+        a = ResultSection("a", classification="A", parent=res)
+        a.set_heuristic(1)
+        b = ResultSection("b", classification="A", parent=a)
+        ResultSection("c", classification="C", parent=b).set_heuristic(2)
+        ResultSection("", classification="D", parent=b)
+        d = ResultSection("d", classification="A", parent=a)
+        d.set_heuristic(1, signature="sig")
+        ResultSection("e", classification="B", parent=d)
+        ResultSection("", classification="A", parent=res)
+        ResultSection("f", classification="A", parent=res)
+
+        output = res.finalize()
+
+        assert output["score"] == 120
+        assert [(section["title_text"], section["depth"], section["classification"])
+                for section in output["sections"]] == [
+            ("a", 0, "C"),
+            ("b", 1, "C"),
+            ("c", 2, "C"),
+            ("d", 1, "B"),
+            ("e", 2, "B"),
+            ("f", 0, "A"),
+        ]
+        assert [section["heuristic"]["score"] if section["heuristic"] else None
+                for section in output["sections"]] == [10, None, 100, 10, None, None]
+        assert [section.title_text for section in res.sections] == ["a", "f"]
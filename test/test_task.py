@@ -0,0 +1,130 @@
+import pytest
+import os
+import json
+import datetime
+
+SERVICE_CONFIG_NAME = "service_manifest.yml"
+TEMP_SERVICE_CONFIG_PATH = os.path.join("/tmp", SERVICE_CONFIG_NAME)
+
+
+def setup_module():
+    if not os.path.exists(TEMP_SERVICE_CONFIG_PATH):
+        open_manifest = open(TEMP_SERVICE_CONFIG_PATH, "w")
+        open_manifest.write("name: Sample\nversion: sample\ndocker_config: \n  image: sample")
+
+
+def teardown_module():
+    if os.path.exists(TEMP_SERVICE_CONFIG_PATH):
+        os.remove(TEMP_SERVICE_CONFIG_PATH)
+
+
+@pytest.fixture
+def task(tmp_path, monkeypatch):
+    import tempfile
+    from assemblyline.odm.messages.task import Task as ServiceTask
+    from assemblyline_v4_service.common.task import Task
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    service_task = ServiceTask(dict(
+        sid="1",
+        fileinfo=dict(magic="ASCII text", md5="0" * 32, mime="text/plain", sha1="0" * 40, sha256="0" * 64,
+                      size=1, type="text/plain"),
+        filename="blah.txt",
+        service_name="Sample",
+        max_files=10,
+        min_classification="TLP:C",
+        ttl=1,
+    ))
+    yield Task(service_task)
+
+
+class TestTask:
+    @staticmethod
+    @pytest.mark.parametrize("temp_submission_data", [
+        {},
+        {"date": datetime.datetime(2020, 1, 1, 1, 2, 3), "none_key": {None: 1}},
+        {"big_int": 2 ** 70},
+    ])
+    def test_save_result(task, tmp_path, temp_submission_data):
+        from assemblyline_v4_service.common.result import Result, ResultSection
+        task.start("TLP:C", "1.0")
+        task.result = Result()
+        section = ResultSection("blah", body="body\nlin\u00e9", parent=task.result)
+        section.add_tag("network.static.uri", "http://blah.com")
+        task.temp_submission_data = temp_submission_data
+        task.success()
+
+        with open(os.path.join(tmp_path, f"1_{'0' * 64}_result.json"), encoding="utf-8") as f:
+            saved = json.load(f)
+
+        assert saved["sha256"] == "0" * 64
+        assert saved["temp_submission_data"] == json.loads(json.dumps(temp_submission_data, default=str))
+        assert saved["result"]["score"] == 0
+        assert saved["result"]["sections"] == [dict(
+            body="body\nlin\u00e9",
+            classification="TLP:C",
+            body_format="TEXT",
+            depth=0,
+            heuristic=None,
+            tags={"network": {"static": {"uri": ["http://blah.com"]}}},
+            title_text="blah",
+        )]
+
+    @staticmethod
+    def test_save_error(task, tmp_path):
+        task.start("TLP:C", "1.0")
+        task.save_error("Traceback", recoverable=True)
+
+        with open(os.path.join(tmp_path, f"1_{'0' * 64}_error.json"), encoding="utf-8") as f:
+            saved = json.load(f)
+
+        assert saved["response"]["status"] == "FAIL_RECOVERABLE"
+        assert saved["response"]["message"] == "Traceback"
+
+    @staticmethod
+    def test_save_result_permissions(task, tmp_path):
+        from assemblyline_v4_service.common.result import Result
+        task.start("TLP:C", "1.0")
+        task.result = Result()
+        old_umask = os.umask(0o002)
+        try:
+            task.success()
+        finally:
+            os.umask(old_umask)
+
+        assert os.stat(os.path.join(tmp_path, f"1_{'0' * 64}_result.json")).st_mode & 0o777 == 0o664
+
+    @staticmethod
+    def test_sha256_cache(task, tmp_path, monkeypatch):
+        from assemblyline_v4_service.common import task as task_module
+        hashed = []
+
+        def get_sha256_for_file(path):
+            hashed.append(path)
+            return f"sha256_{len(hashed)}"
+
+        monkeypatch.setattr(task_module, "get_sha256_for_file", get_sha256_for_file)
+        task.start("TLP:C", "1.0")
+        path = os.path.join(tmp_path, "extracted")
+        with open(path, "w") as f:
+            f.write("blah")
+
+        # Adding the same unchanged file again does not hash it a second time
+        assert task.add_extracted(path, "extracted", "blah")
+        assert task.add_supplementary(path, "supplementary", "blah")
+        assert task.add_extracted(path, "extracted", "blah")
+        assert hashed == [path]
+        assert [file["sha256"] for file in task.extracted + task.supplementary] == ["sha256_1"] * 3
+
+        # A different size triggers a new hash
+        with open(path, "w") as f:
+            f.write("blah blah")
+        assert task.add_supplementary(path, "supplementary", "blah")
+        assert hashed == [path, path]
+        assert task.supplementary[-1]["sha256"] == "sha256_2"
+
+        # So does a different modification time with the same size
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert task.add_extracted(path, "extracted", "blah")
+        assert hashed == [path, path, path]
+        assert task.extracted[-1]["sha256"] == "sha256_3"